@@ -1,11 +1,34 @@
 # app.py
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from datetime import datetime, timedelta
+from sqlalchemy import String, and_, cast, event, func, or_, select
+from sqlalchemy.dialects.sqlite import DATE as SQLiteDate, insert as sqlite_insert
+from sqlalchemy.orm import load_only, raiseload, selectinload
+from datetime import date, datetime, timedelta
+import functools
 import os # Import the os module
+import threading
+import orjson
+from cachetools import TTLCache
+try:
+    import fcntl # Only used for the init-db lock; not available on Windows
+except ImportError:
+    fcntl = None
+
+# JSON provider backed by orjson (C/Rust), much faster than the stdlib json module for
+# the list endpoints. Keys stay sorted to match Flask's default output, but unlike it the
+# output is always compact and non-ASCII text is sent as raw UTF-8 instead of \u escapes.
+class ORJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 
 # --- Configuration ---
 # Define the path for the SQLite database.
@@ -14,9 +37,35 @@ app = Flask(__name__)
 DB_PATH = os.environ.get('DATABASE_PATH', 'site.db') # Use environment variable
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DB_PATH}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Connection pool shared by the gunicorn worker threads. With WAL enabled, readers don't block each other;
+# 'timeout' makes a writer wait up to 15s for the database lock instead of failing immediately.
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_pre_ping': True,
+    'connect_args': {'check_same_thread': False, 'timeout': 15}
+}
 app.config['SECRET_KEY'] = os.environ.get('FLASK_SECRET_KEY', 'your_super_secret_key_for_flask_session_if_used') # Also make secret key configurable via env var
+app.config['RAISE_ON_LAZY_LOAD'] = False # Enabled by the tests to catch N+1 regressions
 
 db = SQLAlchemy(app)
+
+# --- SQLite Tuning ---
+# Applied to every new DBAPI connection: WAL lets readers run alongside a writer,
+# and a bigger page cache / mmap window cuts disk reads on the list endpoints.
+# journal_mode=WAL is persistent in the database file; the rest are per-connection.
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-64000") # ~64 MB
+    cursor.execute("PRAGMA mmap_size=268435456") # 256 MB
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+with app.app_context():
+    event.listen(db.engine, 'connect', set_sqlite_pragmas)
+
 CORS(app) # Enable CORS for all routes. For specific origins, use CORS(app, resources={r"/*": {"origins": "http://localhost:5173"}})
 
 # --- Hardcoded Admin Credentials (For Demo Purposes Only - NOT Secure for Production) ---
@@ -25,50 +74,37 @@ ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'password') # Default password, will be overridden by Render env var
 
 # --- Database Models ---
+# Date columns are stored as YYYY-MM-DD text. Older versions of the API validated with strptime,
+# which also accepts non-padded values like '2020-1-5', and stored them as-is; the regexp lets
+# such rows still be read instead of failing the whole list query. Writes are always YYYY-MM-DD.
+LenientDate = SQLiteDate(regexp=r"(\d+)-(\d+)-(\d+)")
+
 class Student(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     address = db.Column(db.String(200), nullable=True)
     phone = db.Column(db.String(20), nullable=True)
-    admission_date = db.Column(db.String(10), nullable=False) #YYYY-MM-DD, now user-provided
-    admission_cancel_date = db.Column(db.String(10), nullable=True) #YYYY-MM-DD
+    admission_date = db.Column(LenientDate, nullable=False) # now user-provided
+    admission_cancel_date = db.Column(LenientDate, nullable=True)
     monthly_fee = db.Column(db.Float, nullable=False)
     
     # Payments are related to students (one-to-many relationship)
     # cascade="all, delete-orphan" ensures payments are deleted when a student is deleted.
-    payments = db.relationship('Payment', backref='student', lazy=True, order_by='desc(Payment.paid_till)', cascade="all, delete-orphan")
+    payments = db.relationship('Payment', back_populates='student', lazy=True, order_by='desc(Payment.paid_till)', cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"Student('{self.name}', '{self.phone}')"
 
-    def to_dict(self):
-        # Determine the latest paid_till date from payments
-        latest_paid_till = None
-        if self.payments:
-            # payments are ordered by paid_till descending, so first is latest
-            latest_paid_till = self.payments[0].paid_till
-
-        # Calculate pending amount and months using the global utility function
-        pending_months, pending_amount = calculate_pending_fees(self.monthly_fee, self.admission_date, latest_paid_till)
-
-        return {
-            'id': self.id,
-            'name': self.name,
-            'address': self.address,
-            'phone': self.phone,
-            'admission_date': self.admission_date,
-            'admission_cancel_date': self.admission_cancel_date,
-            'monthly_fee': self.monthly_fee,
-            'paid_till': latest_paid_till, # Add latest paid_till for convenience in list view
-            'pending_months': pending_months,
-            'pending_amount': pending_amount
-        }
-    
 
 class Payment(db.Model):
+    # Composite index lets SQLite seek the latest paid_till per student (MAX / ORDER BY ... DESC)
+    __table_args__ = (db.Index('ix_payment_student_paidtill', 'student_id', 'paid_till'),)
+
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
-    paid_till = db.Column(db.String(10), nullable=False) #YYYY-MM-DD
+    paid_till = db.Column(LenientDate, nullable=False)
+
+    student = db.relationship('Student', back_populates='payments')
 
     def __repr__(self):
         return f"Payment('{self.student_id}', '{self.paid_till}')"
@@ -80,67 +116,157 @@ class Payment(db.Model):
             'paid_till': self.paid_till
         }
 
+# Single-row counter bumped in the same transaction as every student/payment insert or delete.
+# Unlike MAX(id)/COUNT(*) it never repeats (SQLite reuses the highest rowid after a delete),
+# so it is safe to use as the ETag / cache version for the list endpoints.
+class DataVersion(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+
+# --- Utility Function to parse request dates ---
+# Accepts only YYYY-MM-DD. On Python 3.11+ date.fromisoformat alone also accepts
+# forms like '20240101' or '2024-W10-1', so round-trip to reject anything non-canonical.
+def parse_iso_date(value):
+    if not isinstance(value, str):
+        raise ValueError(f"Expected a YYYY-MM-DD string, got {value!r}")
+    parsed = date.fromisoformat(value)
+    if parsed.isoformat() != value:
+        raise ValueError(f"Expected a YYYY-MM-DD string, got {value!r}")
+    return parsed
+
 # --- Utility Function to calculate pending fees for display ---
+# Dates come back from the DB as datetime.date objects; the orjson provider renders them as YYYY-MM-DD.
+# Month index (year * 12 + month) so month differences are plain subtraction.
+def _month_index(d):
+    return d.year * 12 + d.month
+
 # This function calculates pending months and amount based on provided dates.
 # It considers the current date and determines if past months are pending.
+# List endpoints compute today_month_index / today_day once per request and pass them in,
+# so every student in a response is evaluated against the same "today".
 # Returns (pending_months, pending_amount)
-def calculate_pending_fees(student_monthly_fee, admission_date_str, latest_paid_till_str):
+def calculate_pending_fees(student_monthly_fee, admission_date, latest_paid_till, today_month_index=None, today_day=None):
+    if today_month_index is None or today_day is None:
+        today = date.today()
+        today_month_index, today_day = _month_index(today), today.day
+    return _calculate_pending_fees(student_monthly_fee, admission_date, latest_paid_till, today_month_index, today_day)
+
+# Pure function of its arguments, so results are memoized. Repeated polls within a day hit
+# the cache; "today" is part of the key, so entries go stale naturally at day rollover.
+@functools.lru_cache(maxsize=4096)
+def _calculate_pending_fees(student_monthly_fee, admission_date, latest_paid_till, today_month_index, today_day):
     pending_months = 0
-    today = datetime.now()
 
-    if not latest_paid_till_str:
+    if not latest_paid_till:
         # If no payments, pending is calculated from the admission month
-        admission_dt = datetime.strptime(admission_date_str, '%Y-%m-%d')
-        
+        admission_month_index = _month_index(admission_date)
+
         # Calculate full months passed from admission month up to (and including) current month
         # Example: if admitted in Jan 2024, and it's March 2024, then Jan, Feb, Mar are 3 months.
-        # This includes the current month if its due date has passed or is ongoing
-        
-        # Months difference accounting for year
-        months_diff = (today.year - admission_dt.year) * 12 + (today.month - admission_dt.month)
-
-        # If admitted in the current month, and it's before end of current month, 0 pending
-        if months_diff == 0 and admission_dt.year == today.year and admission_dt.month == today.month:
-            pending_months = 0 # Admitted this month, fee for this month not yet due/counted
-        else:
-            pending_months = months_diff + 1 # Include the current month as pending
-            # Refinement: If current day is before 1st of month, and fee is due later, reduce a month
-            # This logic depends on exact business rules for when fees become 'pending'
-            # For simplicity, if current month's fee is due by end of month, and paid_till
-            # is BEFORE current month, then current month is pending.
-            if today.day < 1 and months_diff > 0: # If it's early in the month, and last payment was previous month
-                pending_months -=1 # The current month might not be considered pending yet
+        months_diff = today_month_index - admission_month_index
+
+        # If admitted in the current month, the fee for this month is not yet due/counted
+        if months_diff != 0:
+            pending_months = max(0, months_diff + 1) # Include the current month as pending
 
     else:
-        paid_till_dt = datetime.strptime(latest_paid_till_str, '%Y-%m-%d')
-        
-        # The first month to be considered pending is the month *after* paid_till_dt
-        start_pending_dt = paid_till_dt + timedelta(days=1)
-        if start_pending_dt.day != 1: # Ensure we start from the 1st of the next month
-            if paid_till_dt.month == 12:
-                start_pending_dt = paid_till_dt.replace(year=paid_till_dt.year + 1, month=1, day=1)
-            else:
-                start_pending_dt = paid_till_dt.replace(month=paid_till_dt.month + 1, day=1)
-
-        # Calculate months between start_pending_dt (inclusive) and today (inclusive of current month)
-        if start_pending_dt.year > today.year or \
-           (start_pending_dt.year == today.year and start_pending_dt.month > today.month):
-            pending_months = 0 # Paid up for current and possibly future months
-        else:
-            # Count full months from start_pending_dt up to current month
-            pending_months = (today.year - start_pending_dt.year) * 12 + (today.month - start_pending_dt.month) + 1
-            # If current day is very early in the month, and last payment was end of previous month
-            # you might not want to count current month as pending yet. Adjust as per actual due date.
-            # E.g., if fees due by 5th, and it's 3rd, and last paid till last month, current month is not pending.
-            # Simplified: If today is the 1st of the month, and last paid was previous month, current month might not be counted yet.
-            if today.day == 1 and paid_till_dt.month == (today.month - 1) % 12 and paid_till_dt.year == (today.year if today.month != 1 else today.year -1):
-                 pending_months -=1 # If fees for current month are due mid-month, and it's the 1st, don't count yet.
+        paid_till_month_index = _month_index(latest_paid_till)
+
+        # The first month to be considered pending is the month *after* paid_till;
+        # count from there up to and including the current month.
+        pending_months = max(0, today_month_index - paid_till_month_index)
+
+        # Simplified: If today is the 1st of the month, and last paid was previous month, current month might not be counted yet.
+        if today_day == 1 and pending_months == 1:
+            pending_months -= 1 # If fees for current month are due mid-month, and it's the 1st, don't count yet.
 
     pending_amount = student_monthly_fee * pending_months if pending_months > 0 else 0
     return pending_months, pending_amount
 
+# --- Serialization helper for list endpoints ---
+# Builds the student dict from a precomputed latest paid_till, so callers that
+# already aggregated MAX(paid_till) in SQL don't need to load the payments.
+# Kept as a single dict literal with direct attribute reads: that is already the fastest
+# way CPython builds a dict, so a key tuple or generated function wouldn't be quicker.
+def student_to_dict(student, latest_paid_till, today_month_index=None, today_day=None):
+    # Calculate pending amount and months using the global utility function
+    pending_months, pending_amount = calculate_pending_fees(student.monthly_fee, student.admission_date, latest_paid_till, today_month_index, today_day)
+
+    return {
+        'id': student.id,
+        'name': student.name,
+        'address': student.address,
+        'phone': student.phone,
+        'admission_date': student.admission_date,
+        'admission_cancel_date': student.admission_cancel_date,
+        'monthly_fee': student.monthly_fee,
+        'paid_till': latest_paid_till, # Add latest paid_till for convenience in list view
+        'pending_months': pending_months,
+        'pending_amount': pending_amount
+    }
+
+# Loader options for the list queries: SELECT only the columns student_to_dict() serializes,
+# so columns added to Student later don't widen every list response's rows.
+# The test suite sets RAISE_ON_LAZY_LOAD so an accidental relationship access (an N+1)
+# fails the tests via raiseload("*"); in production it would just be a slower query.
+def student_list_options():
+    options = (
+        load_only(Student.id, Student.name, Student.address, Student.phone, Student.admission_date,
+                  Student.admission_cancel_date, Student.monthly_fee),
+    )
+    if app.config['RAISE_ON_LAZY_LOAD']:
+        options += (raiseload('*'),)
+    return options
+
+# Returns (student, latest_paid_till) rows in a single query, without materializing Payment rows.
+def students_with_latest_paid_till():
+    return db.session.query(Student, func.max(Payment.paid_till)).outerjoin(Payment).group_by(Student.id).options(*student_list_options()).all()
+
+# Like students_with_latest_paid_till(), but lets SQLite drop students who are paid up so
+# only candidates for /students/pending come back. Mirrors calculate_pending_fees:
+# - no payment: pending once admitted before the current month
+# - with payment: pending once paid_till is before the current month; on the 1st the
+#   current month isn't counted yet, so paid_till must be before the previous month
+def pending_students_with_latest_paid_till(today):
+    latest = select(Payment.student_id, func.max(Payment.paid_till).label('mx')).group_by(Payment.student_id).subquery()
+    month_start = today.replace(day=1)
+    paid_cutoff = month_start if today.day != 1 else (month_start - timedelta(days=1)).replace(day=1)
+    return db.session.query(Student, latest.c.mx).outerjoin(latest, latest.c.student_id == Student.id).filter(
+        or_(
+            and_(latest.c.mx.is_(None), Student.admission_date < month_start),
+            latest.c.mx < paid_cutoff
+        )
+    ).options(*student_list_options()).all()
+
+# Current version of the student/payment data (0 before the first write).
+def data_version():
+    return db.session.query(DataVersion.version).filter_by(id=1).scalar() or 0
+
+# Must be called in the same transaction as every insert/delete of a Student or Payment.
+# Upserts the counter row, so it also works on databases that don't have it yet.
+def bump_data_version():
+    table = DataVersion.__table__
+    db.session.execute(
+        sqlite_insert(table).values(id=1, version=1)
+        .on_conflict_do_update(index_elements=[table.c.id], set_={'version': table.c.version + 1})
+    )
+
+# ETag for the list endpoints: pending fees also depend on the current date, so include it.
+def students_etag(prefix, today, version=None):
+    if version is None:
+        version = data_version()
+    return f"{prefix}-{today.isoformat()}-{version}"
+
+# Short-lived in-process cache of the /students/pending payload, keyed on (today, data_version()).
+# Every student/payment write bumps the version, so a stale entry is never served after a change;
+# repeat polls within the TTL skip the pending query and fee computation entirely.
+# TTLCache isn't thread-safe, and gunicorn runs threaded workers, so guard it with a lock.
+_pending_cache = TTLCache(maxsize=4, ttl=60)
+_pending_cache_lock = threading.Lock()
+
 # --- Database Initialization ---
-# This block ensures tables are created and dummy data is inserted when the app starts.
+# This block ensures tables are created and dummy data is inserted.
+# Run it once per deploy with `flask --app app init-db` (or by starting the dev server).
 # It must be within an application context.
 def init_db_and_data():
     with app.app_context():
@@ -148,44 +274,103 @@ def init_db_and_data():
         db_dir = os.path.dirname(DB_PATH)
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir)
-        db.create_all()
-        # Add some dummy data for testing if the database is empty
-        if not Student.query.first():
-            print("Adding dummy data...")
-            student1 = Student(name='Alice Wonderland', address='123 Rabbit Hole', phone='9876543210', admission_date='2023-01-10', monthly_fee=1500.00)
-            student2 = Student(name='Bob The Builder', address='456 Construction Site', phone='1234567890', admission_date='2023-03-01', monthly_fee=1200.00)
-            student3 = Student(name='Charlie Chaplin', address='789 Hollywood Blvd', phone='9988776655', admission_date='2024-01-05', monthly_fee=2000.00)
-            student4 = Student(name='Diana Prince', address='Themyscira', phone='1122334455', admission_date='2024-05-20', monthly_fee=1800.00) # Paid for May
-            student5 = Student(name='Bruce Wayne', address='Batcave', phone='6677889900', admission_date='2024-06-15', monthly_fee=2500.00) # Recently admitted, no initial payment
-
-            db.session.add_all([student1, student2, student3, student4, student5])
-            db.session.commit() # Commit to get student IDs
-
-            # Add payments
+        # Only one process at a time may create tables / seed; the others wait, then see the data.
+        # Without fcntl (Windows local dev) there are no concurrent workers to guard against.
+        if fcntl is None:
+            _create_tables_and_seed()
+            return
+        with open(DB_PATH + '.init.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            _create_tables_and_seed()
+
+def _create_tables_and_seed():
+    db.create_all()
+    # create_all() skips indexes on tables that already exist, so add any missing ones explicitly
+    for index in Payment.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    _normalize_legacy_dates()
+    # Add some dummy data for testing if the database is empty.
+    # The check and all inserts run in one transaction, committed when the block exits.
+    with db.session.begin():
+        if Student.query.first():
+            print("Database already contains data, skipping dummy data insertion.")
+            return
+        print("Adding dummy data...")
+        students_data = [
+            dict(name='Alice Wonderland', address='123 Rabbit Hole', phone='9876543210', admission_date=date(2023, 1, 10), monthly_fee=1500.00),
+            dict(name='Bob The Builder', address='456 Construction Site', phone='1234567890', admission_date=date(2023, 3, 1), monthly_fee=1200.00),
+            dict(name='Charlie Chaplin', address='789 Hollywood Blvd', phone='9988776655', admission_date=date(2024, 1, 5), monthly_fee=2000.00),
+            dict(name='Diana Prince', address='Themyscira', phone='1122334455', admission_date=date(2024, 5, 20), monthly_fee=1800.00), # Paid for May
+            dict(name='Bruce Wayne', address='Batcave', phone='6677889900', admission_date=date(2024, 6, 15), monthly_fee=2500.00), # Recently admitted, no initial payment
+        ]
+
+        # One batched INSERT; RETURNING hands back the generated IDs in parameter order
+        student_table = Student.__table__
+        student1_id, student2_id, student3_id, student4_id, student5_id = db.session.execute(
+            student_table.insert().returning(student_table.c.id, sort_by_parameter_order=True),
+            students_data
+        ).scalars().all()
+
+        # Add payments
+        payments_data = [
             # Alice: Paid till end of previous month (relative to today, end of June)
-            payment1_s1 = Payment(student_id=student1.id, paid_till='2024-05-31') # Pending for June and July (if today is July)
-            payment2_s1 = Payment(student_id=student1.id, paid_till='2024-06-30') # Paid till end of June. Pending from July onwards.
+            dict(student_id=student1_id, paid_till=date(2024, 5, 31)), # Pending for June and July (if today is July)
+            dict(student_id=student1_id, paid_till=date(2024, 6, 30)), # Paid till end of June. Pending from July onwards.
 
             # Bob: Paid till July 2023. Very much pending.
-            payment1_s2 = Payment(student_id=student2.id, paid_till='2023-07-31') 
+            dict(student_id=student2_id, paid_till=date(2023, 7, 31)),
 
             # Charlie: Paid till Jan 2024. Pending since Feb.
-            payment1_s3 = Payment(student_id=student3.id, paid_till='2024-01-31') 
-            
+            dict(student_id=student3_id, paid_till=date(2024, 1, 31)),
+
             # Diana: Paid till May 2024.
-            payment1_s4 = Payment(student_id=student4.id, paid_till='2024-05-31')
-            payment2_s4 = Payment(student_id=student4.id, paid_till='2024-06-30') # Paid till end of June. Pending from July onwards.
+            dict(student_id=student4_id, paid_till=date(2024, 5, 31)),
+            dict(student_id=student4_id, paid_till=date(2024, 6, 30)), # Paid till end of June. Pending from July onwards.
 
             # Student 5 (Bruce) has no initial payment recorded, so pending from admission date
-            
-            db.session.add_all([payment1_s1, payment2_s1, payment1_s2, payment1_s3, payment1_s4, payment2_s4])
-            db.session.commit()
-            print("Dummy data added to database.")
-        else:
-            print("Database already contains data, skipping dummy data insertion.")
+        ]
+        db.session.execute(Payment.__table__.insert(), payments_data)
+        bump_data_version()
+    print("Dummy data added to database.")
+
+# One-shot migration: older versions stored dates exactly as received, and their strptime
+# validation accepted non-padded values like '2020-1-5'. Rewrite those to YYYY-MM-DD so the
+# text comparisons in SQL (MAX(paid_till), paid_till < month start) order them correctly.
+def _normalize_legacy_dates():
+    canonical = '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+    columns = [Student.__table__.c.admission_date, Student.__table__.c.admission_cancel_date, Payment.__table__.c.paid_till]
+    with db.session.begin():
+        fixed = 0
+        for column in columns:
+            table = column.table
+            raw_value = cast(column, String) # Read the stored text, not a parsed date
+            rows = db.session.execute(
+                select(table.c.id, raw_value).where(column.is_not(None), raw_value.op('NOT GLOB')(canonical))
+            ).all()
+            for row_id, value in rows:
+                db.session.execute(
+                    table.update().where(table.c.id == row_id).values({column.name: datetime.strptime(value, '%Y-%m-%d').date()})
+                )
+            fixed += len(rows)
+        if fixed:
+            bump_data_version()
+            print(f"Normalized {fixed} legacy date value(s) to YYYY-MM-DD.")
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create tables and indexes, and seed dummy data into an empty database."""
+    init_db_and_data()
 
 # --- Routes ---
 
+# Return 404s raised inside API routes (get_or_404/first_or_404) as JSON, like the other API errors.
+# Unknown URLs keep Werkzeug's default 404 page.
+@app.errorhandler(404)
+def not_found(error):
+    if request.url_rule is None:
+        return error
+    return jsonify({"error": error.description}), 404
+
 # Basic registration (dummy implementation, no actual user DB persistence)
 @app.route('/register', methods=['POST'])
 def register_user():
@@ -238,12 +423,20 @@ def change_password():
 
 @app.route('/students', methods=['GET'])
 def get_students():
-    students = Student.query.all()
+    today = date.today() # One consistent "today" for the whole response
+    # Frontend polls this list; skip the pending-fee computation when nothing changed
+    etag = students_etag('students', today)
+    if request.if_none_match.contains(etag):
+        return '', 304, {'ETag': f'"{etag}"'}
+
+    today_month_index = _month_index(today)
     student_list = []
-    for student in students:
-        s_dict = student.to_dict() # Uses the global calculate_pending_fees
+    for student, latest_paid_till in students_with_latest_paid_till():
+        s_dict = student_to_dict(student, latest_paid_till, today_month_index, today.day) # Uses the global calculate_pending_fees
         student_list.append(s_dict)
-    return jsonify(student_list)
+    response = jsonify(student_list)
+    response.set_etag(etag)
+    return response
 
 @app.route('/students', methods=['POST'])
 def add_student():
@@ -260,28 +453,40 @@ def add_student():
 
     try:
         monthly_fee = float(monthly_fee)
-        # Validate date formats
-        datetime.strptime(admission_date, '%Y-%m-%d')
-        datetime.strptime(initial_paid_till, '%Y-%m-%d')
+        # Validate and parse date formats
+        admission_date = parse_iso_date(admission_date)
+        initial_paid_till = parse_iso_date(initial_paid_till)
     except ValueError:
         return jsonify({"error": "Invalid monthly_fee or date format (expected IPCC-MM-DD)"}), 400
 
-    new_student = Student(
+    student_values = dict(
         name=name,
         address=address,
         phone=phone,
         admission_date=admission_date, # Use provided admission date
         monthly_fee=monthly_fee
     )
-    db.session.add(new_student)
-    db.session.commit() # Commit to get the new student's ID
-
-    # Add the initial payment record
-    initial_payment_record = Payment(student_id=new_student.id, paid_till=initial_paid_till)
-    db.session.add(initial_payment_record)
+    # Core INSERT ... RETURNING gives the new ID without an ORM flush;
+    # student and initial payment go out in one transaction with a single commit.
+    student_table = Student.__table__
+    new_student_id = db.session.execute(
+        student_table.insert().values(**student_values).returning(student_table.c.id)
+    ).scalar_one()
+    db.session.execute(Payment.__table__.insert().values(student_id=new_student_id, paid_till=initial_paid_till))
+    bump_data_version()
     db.session.commit()
 
-    return jsonify({"message": "Student added successfully", "student": new_student.to_dict()}), 201
+    # Build the response from the input values instead of re-reading the row
+    pending_months, pending_amount = calculate_pending_fees(monthly_fee, admission_date, initial_paid_till)
+    new_student = {
+        'id': new_student_id,
+        **student_values,
+        'admission_cancel_date': None,
+        'paid_till': initial_paid_till,
+        'pending_months': pending_months,
+        'pending_amount': pending_amount
+    }
+    return jsonify({"message": "Student added successfully", "student": new_student}), 201
 
 @app.route('/students/<int:student_id>', methods=['DELETE'])
 def delete_student(student_id):
@@ -291,54 +496,70 @@ def delete_student(student_id):
     if password_confirmation != ADMIN_PASSWORD:
         return jsonify({"error": "Incorrect password for deletion confirmation"}), 401
 
-    student = Student.query.get(student_id)
-    if not student:
-        return jsonify({"error": "Student not found"}), 404
+    student = db.get_or_404(Student, student_id, description="Student not found")
 
     # Payments are automatically deleted due to cascade="all, delete-orphan" on relationship
     db.session.delete(student)
+    bump_data_version()
     db.session.commit()
     return jsonify({"message": f"Student with ID {student_id} and all related payments deleted successfully"}), 200
 
 @app.route('/students/pending', methods=['GET'])
 def get_pending_students():
-    all_students = Student.query.all()
-    pending_students_list = []
-    for student in all_students:
-        s_dict = student.to_dict() # This calculates pending based on current date
-        if s_dict['pending_amount'] and s_dict['pending_amount'] > 0:
-            pending_students_list.append(s_dict)
-    return jsonify(pending_students_list)
+    today = date.today() # One consistent "today" for the whole response
+    version = data_version()
+    etag = students_etag('pending', today, version)
+    if request.if_none_match.contains(etag):
+        return '', 304, {'ETag': f'"{etag}"'}
+
+    cache_key = (today, version)
+    with _pending_cache_lock:
+        pending_students_list = _pending_cache.get(cache_key)
+
+    if pending_students_list is None:
+        today_month_index = _month_index(today)
+        pending_students_list = []
+        # The SQL filter discards paid-up students; the exact amount is only computed for the rest
+        for student, latest_paid_till in pending_students_with_latest_paid_till(today):
+            s_dict = student_to_dict(student, latest_paid_till, today_month_index, today.day) # This calculates pending based on current date
+            if s_dict['pending_amount'] > 0:
+                pending_students_list.append(s_dict)
+        with _pending_cache_lock:
+            _pending_cache[cache_key] = pending_students_list
+
+    response = jsonify(pending_students_list)
+    response.set_etag(etag)
+    return response
 
 @app.route('/students/<int:student_id>/payments', methods=['GET'])
 def get_student_payments(student_id):
-    student = Student.query.get(student_id)
-    if not student:
-        return jsonify({"error": "Student not found"}), 404
+    # Payments are eagerly loaded in one extra query, already ordered by paid_till descending
+    student = db.first_or_404(
+        select(Student).options(selectinload(Student.payments)).where(Student.id == student_id),
+        description="Student not found"
+    )
 
-    # Fetch payments ordered by paid_till descending
-    payments = Payment.query.filter_by(student_id=student_id).order_by(Payment.paid_till.desc()).all()
+    payments = student.payments
+    # Optional ?limit=N returns only the N most recent payments (pending fees still use the latest)
+    limit = request.args.get('limit', type=int)
+    shown_payments = payments[:limit] if limit is not None and limit >= 0 else payments
     
     # Calculate latest paid till from existing payments
-    latest_paid_till_str = payments[0].paid_till if payments else None
+    latest_paid_till = payments[0].paid_till if payments else None
     
-    # Calculate pending amount and months using the global utility function
-    pending_months, pending_amount = calculate_pending_fees(
-        student.monthly_fee, student.admission_date, latest_paid_till_str
-    )
+    # Pending amount and months are calculated once, inside student_to_dict, and reused below
+    student_dict = student_to_dict(student, latest_paid_till)
 
     return jsonify({
-        "student": student.to_dict(), # student.to_dict() will re-calculate based on its internal logic
-        "payments": [p.to_dict() for p in payments],
-        "pending_months": pending_months, # explicitly include these in the response for frontend
-        "pending_amount": pending_amount  # explicitly include these in the response for frontend
+        "student": student_dict,
+        "payments": [p.to_dict() for p in shown_payments],
+        "pending_months": student_dict['pending_months'], # explicitly include these in the response for frontend
+        "pending_amount": student_dict['pending_amount']  # explicitly include these in the response for frontend
     })
 
 @app.route('/students/<int:student_id>/payments', methods=['PUT'])
 def update_student_payment(student_id):
-    student = Student.query.get(student_id)
-    if not student:
-        return jsonify({"error": "Student not found"}), 404
+    student = db.get_or_404(Student, student_id, description="Student not found")
 
     data = request.get_json()
     paid_till = data.get('paid_till')
@@ -347,13 +568,14 @@ def update_student_payment(student_id):
         return jsonify({"error": "Paid till date is required"}), 400
 
     try:
-        datetime.strptime(paid_till, '%Y-%m-%d')
+        paid_till = parse_iso_date(paid_till)
     except ValueError:
         return jsonify({"error": "Invalid date format for paid_till (expected IPCC-MM-DD)"}), 400
 
     # Create a new payment record for the update
     new_payment = Payment(student_id=student.id, paid_till=paid_till)
     db.session.add(new_payment)
+    bump_data_version()
     db.session.commit()
 
     return jsonify({"message": "Payment updated successfully", "payment": new_payment.to_dict()}), 200
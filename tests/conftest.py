@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+
+# app.py reads DATABASE_PATH at import time, so point it at a throwaway file first
+os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(), 'test.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def client():
+    flask_app = app_module.app
+    # raiseload("*") on the list queries turns any N+1 regression into a test failure
+    flask_app.config.update(TESTING=True, RAISE_ON_LAZY_LOAD=True)
+    with flask_app.app_context():
+        app_module.db.drop_all()
+    app_module.init_db_and_data() # Fresh tables and dummy data for every test
+    app_module._pending_cache.clear()
+    yield flask_app.test_client()
@@ -0,0 +1,197 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event, text
+
+import app as app_module
+from app import Payment, Student, db
+
+
+@pytest.fixture
+def statements(client):
+    # Records every SQL statement sent to SQLite while the test runs
+    executed = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    with app_module.app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count_statement)
+    yield executed
+    event.remove(engine, 'before_cursor_execute', count_statement)
+
+
+def test_get_students_issues_at_most_two_statements(client, statements):
+    response = client.get('/students')
+    assert response.status_code == 200
+    assert len(response.get_json()) == 5
+    assert len(statements) <= 2
+
+
+def test_get_pending_students_issues_at_most_two_statements(client, statements):
+    response = client.get('/students/pending')
+    assert response.status_code == 200
+    assert len(statements) <= 2
+
+
+def test_get_students_returns_304_for_matching_etag(client):
+    response = client.get('/students')
+    etag = response.headers['ETag']
+
+    cached = client.get('/students', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+    assert cached.headers['ETag'] == etag
+
+    client.put('/students/1/payments', json={'paid_till': '2030-01-31'})
+    changed = client.get('/students', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_pending_filter_matches_pending_fee_calculation(client):
+    with app_module.app.app_context():
+        # Edge cases around the month boundaries the SQL filter mirrors
+        students = [
+            Student(name='No payment, admitted Mar', admission_date=date(2025, 3, 20), monthly_fee=100.0),
+            Student(name='No payment, admitted Apr', admission_date=date(2025, 4, 1), monthly_fee=100.0),
+            Student(name='Paid till Feb', admission_date=date(2024, 1, 1), monthly_fee=100.0),
+            Student(name='Paid till Mar', admission_date=date(2024, 1, 1), monthly_fee=100.0),
+            Student(name='Paid till Apr', admission_date=date(2024, 1, 1), monthly_fee=100.0),
+            Student(name='Free, paid till Jan', admission_date=date(2024, 1, 1), monthly_fee=0.0),
+        ]
+        db.session.add_all(students)
+        db.session.flush()
+        db.session.add_all([
+            Payment(student_id=students[2].id, paid_till=date(2025, 2, 28)),
+            Payment(student_id=students[3].id, paid_till=date(2025, 3, 31)),
+            Payment(student_id=students[4].id, paid_till=date(2025, 4, 30)),
+            Payment(student_id=students[5].id, paid_till=date(2025, 1, 31)),
+        ])
+        db.session.commit()
+
+        for today in [date(2025, 3, 31), date(2025, 4, 1), date(2025, 4, 2), date(2025, 5, 1), date(2026, 1, 1)]:
+            month_index = app_module._month_index(today)
+            expected = {
+                student.id for student, latest in app_module.students_with_latest_paid_till()
+                if app_module.student_to_dict(student, latest, month_index, today.day)['pending_amount'] > 0
+            }
+            candidates = {student.id for student, _ in app_module.pending_students_with_latest_paid_till(today)}
+            # The SQL filter may only drop students who owe nothing
+            assert expected <= candidates
+            assert candidates - expected <= {students[5].id} # monthly_fee == 0 is left to the Python check
+
+
+@pytest.mark.parametrize('value', ['2024-W10-1', '20240101', '2024-3-1'])
+def test_non_canonical_dates_are_rejected(client, value):
+    response = client.post('/students', json={
+        'name': 'X', 'admission_date': '2024-01-01', 'initial_paid_till': value, 'monthly_fee': 100
+    })
+    assert response.status_code == 400
+    response = client.put('/students/1/payments', json={'paid_till': value})
+    assert response.status_code == 400
+    assert client.get('/students').status_code == 200
+
+
+def test_etag_changes_when_newest_student_is_replaced(client):
+    # SQLite reuses the highest rowid, so deleting the newest student and adding another
+    # recreates the same student and payment ids; the ETag must still change.
+    new_student = {'name': 'Y', 'admission_date': '2024-01-01', 'initial_paid_till': '2024-01-31', 'monthly_fee': 100}
+    student_id = client.post('/students', json=new_student).get_json()['student']['id']
+    etag = client.get('/students').headers['ETag']
+
+    client.delete(f'/students/{student_id}', json={'password': app_module.ADMIN_PASSWORD})
+    replacement = client.post('/students', json=dict(new_student, name='Z')).get_json()['student']
+    assert replacement['id'] == student_id
+
+    response = client.get('/students', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert [s['name'] for s in response.get_json()][-1] == 'Z'
+
+
+def test_pending_cache_sees_replaced_newest_student(client):
+    new_student = {'name': 'Y', 'admission_date': '2024-01-01', 'initial_paid_till': '2099-12-31', 'monthly_fee': 100}
+    student_id = client.post('/students', json=new_student).get_json()['student']['id']
+    assert student_id not in [s['id'] for s in client.get('/students/pending').get_json()]
+
+    # Same student and payment ids come back, but this time the student is heavily overdue
+    client.delete(f'/students/{student_id}', json={'password': app_module.ADMIN_PASSWORD})
+    overdue = dict(new_student, name='Overdue', admission_date='2020-01-01', initial_paid_till='2020-01-31', monthly_fee=999)
+    assert client.post('/students', json=overdue).get_json()['student']['id'] == student_id
+
+    pending = client.get('/students/pending').get_json()
+    assert 'Overdue' in [s['name'] for s in pending]
+
+
+def test_list_endpoints_read_non_padded_legacy_dates(client):
+    # Older versions stored dates exactly as received, and strptime accepted '2020-1-5'
+    with app_module.app.app_context():
+        db.session.execute(text(
+            "INSERT INTO student (name, admission_date, monthly_fee) VALUES ('Legacy', '2020-1-5', 100.0)"
+        ))
+        db.session.commit()
+
+    for path in ['/students', '/students/pending']:
+        response = client.get(path)
+        assert response.status_code == 200
+        legacy = [s for s in response.get_json() if s['name'] == 'Legacy']
+        assert legacy and legacy[0]['admission_date'] == '2020-01-05'
+
+
+def test_init_db_normalizes_non_padded_legacy_dates(client):
+    with app_module.app.app_context():
+        db.session.execute(text(
+            "INSERT INTO student (id, name, admission_date, monthly_fee) VALUES (100, 'Legacy', '2020-1-5', 100.0)"
+        ))
+        # As text '2020-9-30' sorts after '2020-10-5', so MAX(paid_till) was wrong before normalizing
+        db.session.execute(text(
+            "INSERT INTO payment (student_id, paid_till) VALUES (100, '2020-9-30'), (100, '2020-10-5')"
+        ))
+        db.session.commit()
+
+    app_module.init_db_and_data()
+
+    with app_module.app.app_context():
+        stored = db.session.execute(text(
+            "SELECT admission_date FROM student WHERE id = 100 UNION ALL SELECT paid_till FROM payment WHERE student_id = 100"
+        )).scalars().all()
+    assert sorted(stored) == ['2020-01-05', '2020-09-30', '2020-10-05']
+
+    for path in ['/students', '/students/pending']:
+        response = client.get(path)
+        assert response.status_code == 200
+        legacy = [s for s in response.get_json() if s['id'] == 100]
+        assert legacy and legacy[0]['paid_till'] == '2020-10-05'
+
+
+def test_json_responses_are_compact_utf8(client):
+    response = client.post('/students', json={
+        'name': 'Ñandú', 'admission_date': '2024-01-01', 'initial_paid_till': '2024-01-31', 'monthly_fee': 100
+    })
+    assert response.status_code == 201
+    assert response.mimetype == 'application/json'
+    assert 'Ñandú'.encode() in response.data # orjson never \u-escapes non-ASCII text
+    assert b'\n ' not in response.data # and never indents, even in debug mode
+    assert response.get_json()['student']['name'] == 'Ñandú'
+
+
+def test_missing_student_is_a_json_404_but_unknown_urls_are_not(client):
+    response = client.get('/students/999/payments')
+    assert response.status_code == 404
+    assert response.get_json() == {'error': 'Student not found'}
+
+    response = client.get('/no-such-page')
+    assert response.status_code == 404
+    assert response.mimetype == 'text/html'
+
+
+def test_add_student_response_matches_stored_student(client):
+    response = client.post('/students', json={
+        'name': 'New', 'address': 'Street 1', 'phone': '555', 'admission_date': '2020-01-10',
+        'initial_paid_till': '2020-06-30', 'monthly_fee': '250'
+    })
+    assert response.status_code == 201
+    created = response.get_json()['student']
+    stored = client.get(f"/students/{created['id']}/payments").get_json()['student']
+    assert created == stored